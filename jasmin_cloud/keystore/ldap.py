@@ -2,6 +2,8 @@
 Module implementing an LDAP key store.
 """
 
+import time
+
 from jasmin_ldap import ServerPool, Connection, Query
 
 from .base import KeyStore
@@ -17,8 +19,11 @@ class LdapKeyStore(KeyStore):
         replicas: List of hostnames of LDAP read-only replicas.
         user: The DN to use to connect.
         password: The password to use to connect.
+        cache_ttl: The number of seconds for which keys are cached (default ``0``,
+                   i.e. no caching). A key that is changed in LDAP may take up
+                   to this long to be picked up.
     """
-    def __init__(self, primary, base_dn, replicas = [], user = '', password = ''):
+    def __init__(self, primary, base_dn, replicas = [], user = '', password = '', cache_ttl = 0):
         # Just store the parameters for the connection. We will create the
         # connection when required.
         self.primary = primary
@@ -26,11 +31,30 @@ class LdapKeyStore(KeyStore):
         self.user = user
         self.password = password
         self.base_dn = base_dn
+        self.cache_ttl = cache_ttl
+        # Cache of (expiry, key) pairs indexed by username
+        self._cache = {}
 
     def get_key(self, username):
         """
         See :py:meth:`.base.KeyStore.get_key`.
         """
+        # Users often create several resources in quick succession, so avoid
+        # making a new LDAP connection for each one
+        now = time.monotonic()
+        cached = self._cache.get(username)
+        if cached and now < cached[0]:
+            return cached[1]
+        key = self._fetch_key(username)
+        if self.cache_ttl:
+            # Drop any expired entries, including this user's, so that the cache
+            # only holds users seen within the TTL
+            cache = { u: e for u, e in self._cache.items() if now < e[0] }
+            cache[username] = (now + self.cache_ttl, key)
+            self._cache = cache
+        return key
+
+    def _fetch_key(self, username):
         connection = Connection.create(
             ServerPool(self.primary, self.replicas),
             user = self.user, password = self.password
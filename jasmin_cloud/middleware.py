@@ -10,6 +10,11 @@ def provider_session(get_response):
     """
     Middleware to inject a cloud provider session onto the request based on a token in a cookie.
     """
+    # The middleware factory is only called once at startup, so resolve the
+    # cookie settings here rather than on every response
+    cookie_name = cloud_settings.TOKEN_COOKIE_NAME
+    cookie_secure = cloud_settings.TOKEN_COOKIE_SECURE
+
     def middleware(request):
         # First, process the request
         response = get_response(request)
@@ -17,13 +22,16 @@ def provider_session(get_response):
         session = getattr(request, 'auth', None)
         if session:
             # If there is an open session, set the token cookie and close it
-            response.set_signed_cookie(
-                cloud_settings.TOKEN_COOKIE_NAME,
-                session.token(),
-                secure = cloud_settings.TOKEN_COOKIE_SECURE,
-                httponly = True,
-                samesite = 'Strict'
-            )
+            # The cookie is only set if the client doesn't already hold the same token
+            token = session.token()
+            if request.get_signed_cookie(cookie_name, None) != token:
+                response.set_signed_cookie(
+                    cookie_name,
+                    token,
+                    secure = cookie_secure,
+                    httponly = True,
+                    samesite = 'Strict'
+                )
             session.close()
         return response
     return middleware
@@ -4,23 +4,27 @@ This module contains the cluster engine implementation for AWX.
 
 import logging
 import functools
+import concurrent.futures
 import io
 import json
 import uuid
 import time
 
-import dateutil.parser
-
 import rackit
 
 from . import api
 from .. import base
 from ... import dto, errors
+from ...utils import parse_datetime
 
 
 logger = logging.getLogger(__name__)
 
 
+#: The maximum number of concurrent requests made when loading cluster types
+_MAX_WORKERS = 8
+
+
 class Engine(base.Engine):
     """
     Cluster engine implementation for AWX.
@@ -107,6 +111,9 @@ class ClusterManager(base.ClusterManager):
         self._credential_type = credential_type
         self._template_inventory = template_inventory
         self._team = team
+        # Cluster types loaded by this manager, indexed by job template name and
+        # metadata location
+        self._cluster_types = {}
 
     def _log(self, message, *args, level = logging.INFO, **kwargs):
         logger.log(
@@ -126,29 +133,44 @@ class ClusterManager(base.ClusterManager):
             raise errors.ImproperlyConfiguredError(
                 "No metadata specified for cluster type '{}'".format(job_template.name)
             )
-        self._log("Loading metadata from {}".format(job_template.description))
-        return dto.ClusterType.from_yaml(job_template.name, job_template.description)
+        # Loading the metadata may require an HTTP request, so only do it once
+        key = (job_template.name, job_template.description)
+        if key not in self._cluster_types:
+            self._log("Loading metadata from {}".format(job_template.description))
+            self._cluster_types[key] = dto.ClusterType.from_yaml(
+                job_template.name,
+                job_template.description
+            )
+        return self._cluster_types[key]
 
     def cluster_types(self):
         """
         See :py:meth:`.base.ClusterManager.cluster_types`.
         """
-        # Get the names of the job temaplates that the team has been
-        # granted execute access for
-        self._log("Fetching team permissions")
-        permitted = {
-            role.summary_fields['resource_name']
-            for role in self._team.roles.all()
-            if role.name.lower() == 'execute' and
-               role.summary_fields['resource_type'] == 'job_template'
-        }
-        self._log("Found %s permitted job templates", len(permitted))
-        # Fetch the job templates, filter the allowed ones and return the cluster types
-        return tuple(
-            self._from_job_template(jt)
-            for jt in self._connection.job_templates.all()
-            if jt.name in permitted
-        )
+        with concurrent.futures.ThreadPoolExecutor(max_workers = _MAX_WORKERS) as executor:
+            # The team permissions and the job templates are independent, so fetch
+            # them at the same time
+            self._log("Fetching team permissions")
+            roles = executor.submit(lambda: tuple(self._team.roles.all()))
+            job_templates = executor.submit(lambda: tuple(self._connection.job_templates.all()))
+            # Get the names of the job temaplates that the team has been
+            # granted execute access for
+            permitted = {
+                role.summary_fields['resource_name']
+                for role in roles.result()
+                if role.name.lower() == 'execute' and
+                   role.summary_fields['resource_type'] == 'job_template'
+            }
+            self._log("Found %s permitted job templates", len(permitted))
+            # Filter the allowed job templates and return the cluster types
+            # Loading the metadata for each one may require an HTTP request, so
+            # load them concurrently
+            return tuple(
+                executor.map(
+                    self._from_job_template,
+                    [jt for jt in job_templates.result() if jt.name in permitted]
+                )
+            )
 
     def find_cluster_type(self, name):
         """
@@ -262,9 +284,9 @@ class ClusterManager(base.ClusterManager):
             error_message,
             params,
             (),
-            dateutil.parser.parse(inventory.created),
-            dateutil.parser.parse(updated) if updated else None,
-            dateutil.parser.parse(patched) if patched else None
+            parse_datetime(inventory.created),
+            parse_datetime(updated) if updated else None,
+            parse_datetime(patched) if patched else None
         )
 
     def clusters(self):
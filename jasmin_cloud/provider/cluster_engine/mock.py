@@ -6,9 +6,9 @@ import uuid
 import json
 from functools import reduce
 from datetime import datetime
-import dateutil.parser
 
 from .. import dto, errors
+from ..utils import parse_datetime
 from . import base
 
 
@@ -17,7 +17,8 @@ class Engine(base.Engine):
     Base class for a cluster engine.
     """
     def __init__(self, cluster_types, clusters_file):
-        self._cluster_types = cluster_types
+        # Index the cluster types by name once, rather than scanning them for every lookup
+        self._cluster_types = { ct.name: ct for ct in cluster_types }
         self._clusters_file = clusters_file
 
     def create_manager(self, username, tenancy):
@@ -42,12 +43,12 @@ class ClusterManager(base.ClusterManager):
         self._clusters_file = clusters_file
 
     def cluster_types(self):
-        return tuple(self._cluster_types)
+        return tuple(self._cluster_types.values())
 
     def find_cluster_type(self, name):
         try:
-            return next(ct for ct in self.cluster_types() if ct.name == name)
-        except StopIteration:
+            return self._cluster_types[name]
+        except KeyError:
             raise errors.ObjectNotFoundError("Could not find cluster type '{}'".format(name))
 
     def clusters(self):
@@ -68,9 +69,9 @@ class ClusterManager(base.ClusterManager):
                     None,
                     c['parameter_values'],
                     tuple(c.get('tags', [])),
-                    dateutil.parser.parse(c['created']),
-                    dateutil.parser.parse(c['updated']),
-                    dateutil.parser.parse(c['patched'])
+                    parse_datetime(c['created']),
+                    parse_datetime(c['updated']),
+                    parse_datetime(c['patched'])
                 )
                 for c in json.load(fh)
             )
@@ -5,13 +5,19 @@ This module defines data-transfer objects used by providers.
 import enum
 from collections import namedtuple
 import json
-import re
 import io
 
-import yaml
 import requests
 
 
+#: Prefixes used to detect cluster type specifications that should be fetched over HTTP
+_URL_PREFIXES = ('http://', 'https://')
+#: Session used to fetch cluster type specifications, so that connections are reused
+_http_session = requests.Session()
+#: (connect, read) timeouts for fetching cluster type specifications
+_HTTP_TIMEOUT = (5, 30)
+
+
 class Tenancy(namedtuple('Tenancy', ['id', 'name'])):
     """
     Represents a tenancy/organisation on a cloud provider.
@@ -223,8 +229,8 @@ class ClusterType(namedtuple('ClusterType', ['name',
 
     @classmethod
     def _open(cls, path):
-        if re.match(r'https?://', path):
-            response = requests.get(path)
+        if path.startswith(_URL_PREFIXES):
+            response = _http_session.get(path, timeout = _HTTP_TIMEOUT)
             response.raise_for_status()
             return io.StringIO(response.text)
         else:
@@ -257,8 +263,12 @@ class ClusterType(namedtuple('ClusterType', ['name',
         Returns:
             A :py:class:`ClusterType`.
         """
+        # yaml is only needed when loading cluster types, so import it on first use
+        import yaml
+        # Use the libyaml-based loader if PyYAML was built with it
+        loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
         with cls._open(path) as fh:
-            return cls.from_dict(name, yaml.safe_load(fh))
+            return cls.from_dict(name, yaml.load(fh, Loader = loader))
 
 
 class Cluster(namedtuple('Cluster', ['id', 'name', 'cluster_type',
@@ -10,12 +10,24 @@ import json
 
 import requests
 
+import orjson
+
 import rackit
 
 
 logger = logging.getLogger(__name__)
 
 
+def _response_json(response):
+    """
+    Returns the decoded JSON body of the given response.
+
+    Uses ``orjson``, as the list responses for large tenancies and the token
+    catalog can be sizeable.
+    """
+    return orjson.loads(response.content)
+
+
 class AuthParams:
     """
     Builder object for setting authentication parameters.
@@ -112,7 +124,7 @@ class ResourceManager(rackit.ResourceManager):
     def extract_list(self, response):
         # OpenStack responses have the list under a named key
         # If there is a next page, that is provided under a links attribute
-        json = response.json()
+        json = _response_json(response)
         data = json[self.resource_cls._opts.resource_list_key]
         next_url = next(
             (
@@ -127,9 +139,9 @@ class ResourceManager(rackit.ResourceManager):
     def extract_one(self, response):
         # Some OpenStack responses have the instance under a named key
         if self.resource_cls._opts.resource_key:
-            return response.json()[self.resource_cls._opts.resource_key]
+            return _response_json(response)[self.resource_cls._opts.resource_key]
         else:
-            return response.json()
+            return _response_json(response)
 
     def prepare_params(self, params):
         # If there is a resource key, nest the parameters using it
@@ -216,18 +228,24 @@ class Connection(rackit.Connection):
     """
     projects = rackit.RootResource(AuthProject)
 
-    def __init__(self, auth_url, params, interface = 'public', verify = True):
+    def __init__(self, auth_url, params, interface = 'public', verify = True, adapter = None):
         # Store the given parameters, as it is sometimes useful to be able to query them later
         self.auth_url = auth_url.rstrip('/')
         self.params = params
         self.interface = interface
         self.verify = verify
+        self.adapter = adapter
 
         # Configure the session
         session = requests.Session()
         # This object is the auth object for the session
         session.auth = self
         session.verify = verify
+        # If a transport adapter is given, use it for all requests so that pooled
+        # connections are shared with other connections using the same adapter
+        if adapter:
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
 
         # Once the superclass init is called, we can use the api_{} methods
         super().__init__(auth_url, session)
@@ -237,12 +255,12 @@ class Connection(rackit.Connection):
             response = self.api_post('/auth/tokens', json = dict(auth = params.as_dict()))
         except rackit.ApiError:
             # If the authentication fails, make sure we close the session
-            session.close()
+            self.close()
             raise
         # Extract the token from the headers
         self.token = response.headers['X-Subject-Token']
         # Extract information from the response
-        json = response.json()
+        json = _response_json(response)
         self.username = json['token']['user']['name']
         self.project_id = json['token'].get('project', {}).get('id')
         # Extract the endpoints from the catalog on the correct interface
@@ -283,9 +301,18 @@ class Connection(rackit.Connection):
             # Use token authentication with our token
             AuthParams().use_token(self.token).use_project_id(project_id),
             self.interface,
-            self.verify
+            self.verify,
+            self.adapter
         )
 
+    def close(self):
+        # Detach any shared adapter before closing the session, otherwise closing
+        # the session would tear down the pooled connections for everyone
+        if self.adapter:
+            for prefix in ('https://', 'http://'):
+                self.session.adapters.pop(prefix, None)
+        super().close()
+
 
 class ServiceDescriptor(rackit.CachedProperty):
     """
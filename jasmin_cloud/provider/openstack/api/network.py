@@ -4,7 +4,7 @@ Module containing service and resource definitions for the OpenStack compute API
 
 from rackit import Endpoint, RootResource
 
-from .core import Service, UnmanagedResource, Resource
+from .core import Service, UnmanagedResource, ResourceManager, Resource
 
 
 class Quotas(UnmanagedResource):
@@ -25,11 +25,33 @@ class Quotas(UnmanagedResource):
         )
 
 
+class FloatingIpManager(ResourceManager):
+    """
+    Resource manager for floating IPs.
+    """
+    def count(self):
+        """
+        Returns the number of floating IPs without loading the full resources.
+        """
+        # Only ask for the ids to keep the responses as small as possible
+        # The next links include the query parameters, so they are only needed once
+        count = 0
+        next_url = self.prepare_url()
+        params = dict(fields = 'id')
+        while next_url:
+            response = self.connection.api_get(next_url, params = params)
+            data, next_url = self.extract_list(response)
+            count = count + len(data)
+            params = None
+        return count
+
+
 class FloatingIp(Resource):
     """
     Represents a floating IP.
     """
     class Meta:
+        manager_cls = FloatingIpManager
         endpoint = "/floatingips"
 
 
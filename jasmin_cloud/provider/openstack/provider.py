@@ -3,39 +3,142 @@ This module contains the provider implementation for OpenStack.
 """
 
 import functools
+import concurrent.futures
 import logging
 import base64
 import hashlib
 import json
 import random
+import re
+import threading
+import time
 
-import dateutil.parser
+import requests
+from urllib3.util.retry import Retry
 
 import rackit
 
 from . import api
 from .. import base, errors, dto
+from ..utils import parse_datetime
 
 
 logger = logging.getLogger(__name__)
 
 
 _NET_DEVICE_OWNER = 'network:router_interface'
+_BYTES_TO_MB = 1.0 / (1024 * 1024)
+# The maximum number of API requests made in the background at any one time
+# Only a few independent, top-level requests are ever made concurrently
+_MAX_WORKERS = 4
+# The maximum number of ports to fetch by id in a single request
+_PORT_BATCH_SIZE = 100
+# The number of seconds for which rarely-changing resources are cached by a session
+_CACHE_TTL = 60
+# Flavors are managed by administrators and change even less often
+_SIZES_CACHE_TTL = 120
+# Individual lookups are cached very briefly to collapse repeated reads
+_FIND_CACHE_TTL = 5
+# Heat stacks are cached briefly to absorb clients polling the clusters
+_STACKS_CACHE_TTL = 10
+# Image properties that are passed on to machines as metadata
+_IMAGE_METADATA_KEYS = (
+    'jasmin_nat_allowed',
+    'jasmin_type',
+    'jasmin_private_if',
+    'jasmin_activ_ver',
+)
+
+# Executor used by all sessions to make API requests in the background
+# A session is created for every HTTP request, so a bounded pool is shared
+# rather than creating threads for each one
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers = _MAX_WORKERS)
 _REPLACEMENTS = [
     ('instance', 'machine'),
     ('Instance', 'Machine'),
+    # flavorRef must come before flavor so that the longer name wins the match
     ('flavorRef', 'size'),
     ('flavor', 'size'),
     ('Flavor', 'Size')
 ]
+_REPLACEMENTS_MAP = dict(_REPLACEMENTS)
+_REPLACEMENTS_RE = re.compile('|'.join(re.escape(k) for k, _ in _REPLACEMENTS))
 def _replace_resource_names(message):
-    return functools.reduce(
-        lambda a, x: a.replace(x[0], x[1]),
-        _REPLACEMENTS,
-        message
+    # Make all the replacements in a single pass over the message
+    return _REPLACEMENTS_RE.sub(lambda m: _REPLACEMENTS_MAP[m.group(0)], message)
+
+
+@functools.lru_cache(maxsize = 256)
+def _size(id, name, cpus, ram, disk):
+    # Flavors rarely change, so share the size objects between calls
+    return dto.Size(id, name, cpus, ram, disk)
+
+
+def _quota_exceeded():
+    return errors.QuotaExceededError(
+        'Requested operation would exceed at least one quota. '
+        'Please check your tenancy quotas.'
     )
 
 
+def _handle_403(message):
+    # Some quota exceeded errors get reported as permission denied (WHY???!!!)
+    # So report them as quota exceeded instead
+    if 'exceeded' in message.lower():
+        return _quota_exceeded()
+    return errors.PermissionDeniedError('Permission denied.')
+
+
+def _handle_409(message):
+    # 409 (Conflict) has a lot of different sub-errors depending on
+    # the actual error text
+    if 'exceeded' in message.lower():
+        return _quota_exceeded()
+    return errors.InvalidOperationError(message)
+
+
+def _handle_413(message):
+    # The volume service uses 413 (Payload too large) for quota errors
+    if 'exceedsavailablequota' in message.lower():
+        return _quota_exceeded()
+    return errors.CommunicationError('Unknown error with OpenStack API.')
+
+
+# Matches the parts of cluster error messages that identify known OpenStack errors
+_CLUSTER_ERROR_MARKERS_RE = re.compile(
+    'quota exceeded|exceedsavailablequota|floatingip',
+    re.IGNORECASE
+)
+
+
+# Maps (quota exceeded, floating IP related) to the error message reported for a cluster
+_CLUSTER_ERROR_MESSAGES = {
+    (True, True): (
+        'Could not find an external IP for deployment. '
+        'Please ensure an external IP is available and try again.'
+    ),
+    (True, False): (
+        'Requested resources exceed at least one quota. '
+        'Please check your tenancy quotas and try again.'
+    ),
+    (False, False): (
+        'Error during cluster configuration. '
+        'Please contact support.'
+    ),
+}
+
+
+# Maps status codes to functions that produce the corresponding error
+_STATUS_HANDLERS = {
+    400: errors.BadInputError,
+    401: lambda message: errors.AuthenticationError('Your session has expired.'),
+    403: _handle_403,
+    404: errors.ObjectNotFoundError,
+    409: _handle_409,
+    413: _handle_413,
+}
+
+
 def convert_exceptions(f):
     """
     Decorator that converts OpenStack API exceptions into errors from :py:mod:`..errors`.
@@ -49,40 +152,10 @@ def convert_exceptions(f):
             status_code = exc.status_code
             # Replace the OpenStack resource names with ours
             message = _replace_resource_names(str(exc))
-            if status_code == 400:
-                raise errors.BadInputError(message)
-            elif status_code == 401:
-                raise errors.AuthenticationError('Your session has expired.')
-            elif status_code == 403:
-                # Some quota exceeded errors get reported as permission denied (WHY???!!!)
-                # So report them as quota exceeded instead
-                if 'exceeded' in message.lower():
-                    raise errors.QuotaExceededError(
-                        'Requested operation would exceed at least one quota. '
-                        'Please check your tenancy quotas.'
-                    )
-                raise errors.PermissionDeniedError('Permission denied.')
-            elif status_code == 404:
-                raise errors.ObjectNotFoundError(message)
-            elif status_code == 409:
-                # 409 (Conflict) has a lot of different sub-errors depending on
-                # the actual error text
-                if 'exceeded' in message.lower():
-                    raise errors.QuotaExceededError(
-                        'Requested operation would exceed at least one quota. '
-                        'Please check your tenancy quotas.'
-                    )
-                raise errors.InvalidOperationError(message)
-            elif status_code == 413:
-                # The volume service uses 413 (Payload too large) for quota errors
-                if 'exceedsavailablequota' in message.lower():
-                    raise errors.QuotaExceededError(
-                        'Requested operation would exceed at least one quota. '
-                        'Please check your tenancy quotas.'
-                    )
-                raise errors.CommunicationError('Unknown error with OpenStack API.')
-            else:
-                raise errors.CommunicationError('Unknown error with OpenStack API.')
+            handler = _STATUS_HANDLERS.get(status_code)
+            if handler:
+                raise handler(message)
+            raise errors.CommunicationError('Unknown error with OpenStack API.')
         except rackit.RackitError as exc:
             logger.exception('Could not connect to OpenStack API.')
             raise errors.CommunicationError('Could not connect to OpenStack API.')
@@ -108,6 +181,14 @@ class Provider(base.Provider):
                     SSL certificates are not verified.
         cluster_engine: The :py:class:`~..cluster.base.Engine` to use for clusters.
                         If not given, clusters are disabled.
+        pool_size: The maximum number of HTTP connections to keep open to each
+                   OpenStack API host (default ``32``).
+        max_retries: The number of times to retry a request that fails to connect
+                     (default ``3``).
+
+    All the connections created by the provider share a single pool of HTTP
+    connections, so that TCP and TLS connections to the OpenStack APIs are
+    reused between requests.
     """
     provider_name = 'openstack'
 
@@ -118,7 +199,9 @@ class Provider(base.Provider):
                        net_device_owner = None,
                        backdoor_vnic_type = None,
                        verify_ssl = True,
-                       cluster_engine = None):
+                       cluster_engine = None,
+                       pool_size = 32,
+                       max_retries = 3):
         # Strip any trailing slashes from the auth URL
         self._auth_url = auth_url.rstrip('/')
         self._domain = domain
@@ -128,6 +211,33 @@ class Provider(base.Provider):
         self._backdoor_vnic_type = backdoor_vnic_type
         self._verify_ssl = verify_ssl
         self._cluster_engine = cluster_engine
+        # The adapter is thread-safe, so can be shared between all connections
+        # The pool must be at least as large as the number of concurrent requests
+        # a session can make, otherwise connections are discarded rather than reused
+        self._adapter = requests.adapters.HTTPAdapter(
+            pool_maxsize = max(pool_size, _MAX_WORKERS),
+            # Retry requests that fail to connect with a short backoff
+            # A pooled connection that was closed by the server shows up as a read
+            # error, so allow a single read retry - urllib3 only retries reads for
+            # idempotent methods by default, so POSTs are never sent twice
+            max_retries = Retry(
+                total = max_retries,
+                read = 1,
+                backoff_factor = 0.2
+            )
+        )
+
+    def _api_connection(self, auth_params):
+        """
+        Returns a new API connection using the given auth params.
+        """
+        return api.Connection(
+            self._auth_url,
+            auth_params,
+            self._interface,
+            self._verify_ssl,
+            self._adapter
+        )
 
     @convert_exceptions
     def authenticate(self, username, password):
@@ -138,7 +248,7 @@ class Provider(base.Provider):
         # Create an API connection using the username and password
         auth_params = api.AuthParams().use_password(self._domain, username, password)
         try:
-            conn = api.Connection(self._auth_url, auth_params, self._interface, self._verify_ssl)
+            conn = self._api_connection(auth_params)
         except rackit.Unauthorized:
             # We want to use a different error message to convert_exceptions
             raise errors.AuthenticationError('Invalid username or password.')
@@ -160,7 +270,7 @@ class Provider(base.Provider):
         logger.info('Authenticating token with OpenStack')
         auth_params = api.AuthParams().use_token(token)
         try:
-            conn = api.Connection(self._auth_url, auth_params, self._interface, self._verify_ssl)
+            conn = self._api_connection(auth_params)
         except (rackit.Unauthorized, rackit.NotFound):
             # Failing to validate a token is a 404 for some reason
             raise errors.AuthenticationError('Your session has expired.')
@@ -202,6 +312,9 @@ class UnscopedSession(base.UnscopedSession):
         self._net_device_owner = net_device_owner
         self._backdoor_vnic_type = backdoor_vnic_type
         self._cluster_engine = cluster_engine
+        # Scoped connections are cached by project id so that each one only
+        # costs a single token request for the lifetime of the session
+        self._scoped_connections = {}
 
     def token(self):
         """
@@ -221,9 +334,14 @@ class UnscopedSession(base.UnscopedSession):
         See :py:meth:`.base.UnscopedSession.tenancies`.
         """
         logger.info('[%s] Fetching available tenancies', self.username())
-        projects = tuple(self._connection.projects.all())
-        logger.info('[%s] Found %s projects', self.username(), len(projects))
-        return tuple(dto.Tenancy(p.id, p.name) for p in projects if p.enabled)
+        # /auth/projects does not accept an enabled filter, so filter as we stream
+        tenancies = tuple(
+            dto.Tenancy(p.id, p.name)
+            for p in self._connection.projects.all()
+            if p.enabled
+        )
+        logger.info('[%s] Found %s tenancies', self.username(), len(tenancies))
+        return tenancies
 
     @convert_exceptions
     def scoped_session(self, tenancy):
@@ -232,19 +350,25 @@ class UnscopedSession(base.UnscopedSession):
         """
         # Make sure we have a tenancy id
         if not isinstance(tenancy, dto.Tenancy):
-            # There is no (obvious) way to list individual auth projects, so traverse the list
+            # There is no (obvious) way to list individual auth projects, so traverse
+            # the list, stopping as soon as we find a match
             try:
-                tenancy = next(t for t in self.tenancies() if t.id == tenancy)
+                project = next(
+                    p
+                    for p in self._connection.projects.all()
+                    if p.id == tenancy and p.enabled
+                )
             except StopIteration:
                 raise errors.ObjectNotFoundError(
                     'Could not find tenancy with ID {}'.format(tenancy)
                 )
+            tenancy = dto.Tenancy(project.id, project.name)
         logger.info('[%s] [%s] Creating scoped session', self.username(), tenancy.name)
         try:
             return ScopedSession(
                 self.username(),
                 tenancy,
-                self._connection.scoped_connection(tenancy.id),
+                self._scoped_connection(tenancy.id),
                 az_backdoor_net_map = self._az_backdoor_net_map,
                 net_device_owner = self._net_device_owner,
                 backdoor_vnic_type = self._backdoor_vnic_type,
@@ -255,11 +379,28 @@ class UnscopedSession(base.UnscopedSession):
                 'Could not find tenancy with ID {}'.format(tenancy.id)
             )
 
+    def _scoped_connection(self, project_id):
+        """
+        Returns a connection scoped to the given project, reusing an existing
+        connection if one has already been created.
+        """
+        try:
+            return self._scoped_connections[project_id]
+        except KeyError:
+            connection = self._connection.scoped_connection(project_id)
+            self._scoped_connections[project_id] = connection
+            return connection
+
     def close(self):
         """
         See :py:meth:`.base.UnscopedSession.close`.
         """
-        # Just close the underlying connection
+        # Close any scoped connections that were created from this session
+        # The attribute may not exist if __init__ did not complete
+        for connection in getattr(self, '_scoped_connections', {}).values():
+            connection.close()
+        self._scoped_connections = {}
+        # Then close the underlying connection
         self._connection.close()
 
 
@@ -294,9 +435,19 @@ class ScopedSession(base.ScopedSession):
         self._tenancy = tenancy
         self._connection = connection
         self._az_backdoor_net_map = az_backdoor_net_map or dict()
+        # random.choice needs something that supports indexing, so build it once
+        self._az_backdoor_choices = tuple(self._az_backdoor_net_map.items())
         self._net_device_owner = net_device_owner
         self._backdoor_vnic_type = backdoor_vnic_type
         self._cluster_engine = cluster_engine
+        # Keypairs that have been resolved during this session, indexed by public key
+        self._keypairs = {}
+        # Cache of (expiry, value) pairs, indexed by key
+        # Values can be fetched in the background, so access is guarded by a lock
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        # The (token, credential) pair for the cluster engine, built on first use
+        self._cluster_credential_cache = None
 
     def _log(self, message, *args, level = logging.INFO, **kwargs):
         logger.log(
@@ -305,12 +456,66 @@ class ScopedSession(base.ScopedSession):
             self._username, self._tenancy.name, *args, **kwargs
         )
 
+    def _cached(self, key, fetch, ttl = _CACHE_TTL):
+        """
+        Returns the cached value for the given key, calling ``fetch`` to produce
+        the value if it is missing or has expired.
+
+        Lookups that fail, e.g. because the object does not exist, are not cached.
+        """
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached and now < cached[0]:
+            return cached[1]
+        # Don't hold the lock while fetching, as that may take a while
+        value = fetch()
+        with self._cache_lock:
+            self._cache[key] = (now + ttl, value)
+        return value
+
+    def _is_cached(self, key):
+        """
+        Returns ``True`` if there is an unexpired value cached for the given key.
+        """
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        return bool(cached) and time.monotonic() < cached[0]
+
+    def _evict(self, *keys):
+        """
+        Removes the given keys from the cache.
+        """
+        with self._cache_lock:
+            for key in keys:
+                self._cache.pop(key, None)
+
+    def _evict_kind(self, kind, predicate = None):
+        """
+        Removes all the cached lookups of the given kind, e.g. ``'machine'``.
+
+        If ``predicate`` is given, only the cached values for which it returns
+        ``True`` are removed.
+        """
+        with self._cache_lock:
+            keys = [
+                key
+                for key, (_, value) in self._cache.items()
+                if isinstance(key, tuple) and
+                   key[0] == kind and
+                   (predicate is None or predicate(value))
+            ]
+            for key in keys:
+                self._cache.pop(key, None)
+
     @convert_exceptions
     def quotas(self):
         """
         See :py:meth:`.base.ScopedSession.quotas`.
         """
         self._log('Fetching tenancy quotas')
+        # The requests share a single connection, which is not known to be safe to
+        # use from several threads at once, so they are made one after another
         # Compute provides a way to fetch this information through the SDK, but
         # the floating IP quota obtained through it is rubbish...
         compute_limits = self._connection.compute.limits.absolute
@@ -341,8 +546,8 @@ class ScopedSession(base.ScopedSession):
                 'external_ips',
                 None,
                 network_quotas.floatingip,
-                # Just get the length of the list of IPs
-                len(list(self._connection.network.floatingips.all()))
+                # Just get the number of IPs
+                self._connection.network.floatingips.count()
             )
         )
         volume_limits = self._connection.block_store.limits.absolute
@@ -374,7 +579,7 @@ class ScopedSession(base.ScopedSession):
             # Unless specifically disallowed by a flag, NAT is allowed
             bool(int(getattr(api_image, 'jasmin_nat_allowed', '1'))),
             # The image size is specified in bytes. Convert to MB.
-            float(api_image.size) / 1024.0 / 1024.0
+            float(api_image.size) * _BYTES_TO_MB
         )
 
     @convert_exceptions
@@ -385,13 +590,14 @@ class ScopedSession(base.ScopedSession):
         self._log('Fetching available images')
         # Fetch from the SDK using our custom image resource
         # Exclude cluster images from the returned list
-        images = list(
-            image
+        # This can't be done server-side as most images don't have the property at all
+        images = tuple(
+            self._from_api_image(image)
             for image in self._connection.image.images.all(status = 'active')
             if not int(getattr(image, 'jasmin_cluster_image', '0'))
         )
         self._log('Found %s images', len(images))
-        return tuple(self._from_api_image(i) for i in images)
+        return images
 
     @convert_exceptions
     def find_image(self, id):
@@ -406,7 +612,7 @@ class ScopedSession(base.ScopedSession):
         """
         Converts an OpenStack API flavor object into a :py:class:`.dto.Size`.
         """
-        return dto.Size(
+        return _size(
             api_flavor.id,
             api_flavor.name,
             api_flavor.vcpus,
@@ -419,6 +625,10 @@ class ScopedSession(base.ScopedSession):
         """
         See :py:meth:`.base.ScopedSession.sizes`.
         """
+        # Flavors change rarely, so cache the listing for a while
+        return self._cached('sizes', self._fetch_sizes, _SIZES_CACHE_TTL)
+
+    def _fetch_sizes(self):
         self._log('Fetching available flavors')
         flavors = tuple(
             self._from_api_flavor(flavor)
@@ -441,8 +651,19 @@ class ScopedSession(base.ScopedSession):
         Returns the network connected to the tenant router.
         Assumes a single router with a single tenant network connected.
         """
+        # The tenant network almost never changes, so cache it for a short time
+        return self._cached('tenant_network', self._fetch_tenant_network)
+
+    def _fetch_tenant_network(self):
         net_device_owner = self._net_device_owner or _NET_DEVICE_OWNER
-        port = self._connection.network.ports.find_by_device_owner(net_device_owner)
+        # We only need the first matching port, so ask Neutron for a single result
+        port = next(
+            self._connection.network.ports.all(
+                device_owner = net_device_owner,
+                limit = 1
+            ),
+            None
+        )
         if port:
             return self._connection.network.networks.get(port.network_id)
         else:
@@ -452,24 +673,60 @@ class ScopedSession(base.ScopedSession):
         """
         Returns the external network that connects the tenant router to the outside world.
         """
+        return self._cached('external_network', self._fetch_external_network)
+
+    def _fetch_external_network(self):
         try:
-            router = next(self._connection.network.routers.all())
+            router = next(self._connection.network.routers.all(limit = 1))
         except StopIteration:
             raise errors.ImproperlyConfiguredError('Could not find tenancy router.')
         return self._connection.network.networks.get(router.external_gateway_info['network_id'])
 
-    _POWER_STATES = {
-        0: 'Unknown',
-        1: 'Running',
-        3: 'Paused',
-        4: 'Shut down',
-        6: 'Crashed',
-        7: 'Suspended',
-    }
+    # Indexed by the Nova power state, with gaps filled by 'Unknown'
+    _POWER_STATES = (
+        'Unknown',
+        'Running',
+        'Unknown',
+        'Paused',
+        'Shut down',
+        'Unknown',
+        'Crashed',
+        'Suspended',
+    )
+
+    def _metadata_nat_allowed(self, api_server):
+        """
+        Returns the value of the nat_allowed metadata item for the given server,
+        or ``None`` if it is not present.
+        """
+        try:
+            return bool(int(api_server.metadata['jasmin_nat_allowed']))
+        except (KeyError, TypeError):
+            return None
+
+    def _machine_nat_allowed(self, machine):
+        """
+        Returns whether NAT is allowed for the machine with the given id.
+
+        Unlike :py:meth:`find_machine`, this only looks up the image and flavor
+        if they are needed.
+        """
+        api_server = self._connection.compute.servers.get(machine)
+        nat_allowed = self._metadata_nat_allowed(api_server)
+        if nat_allowed is None:
+            try:
+                image = self.find_image(api_server.image.id)
+            except (AttributeError, errors.ObjectNotFoundError):
+                image = None
+            nat_allowed = image.nat_allowed if image else True
+        return nat_allowed
 
-    def _from_api_server(self, api_server):
+    def _from_api_server(self, api_server, tenant_network = None):
         """
         See :py:meth:`.base.ScopedSession.find_machine`.
+
+        When converting many servers, the tenant network can be given to avoid
+        fetching it for each one.
         """
         # Make sure we can find the image and flavor specified
         try:
@@ -483,26 +740,30 @@ class ScopedSession(base.ScopedSession):
         # Try to get nat_allowed from the machine metadata
         # If the nat_allowed metadata is not present, use the image
         # If the image does not exist anymore, assume it is allowed
-        try:
-            nat_allowed = bool(int(api_server.metadata['jasmin_nat_allowed']))
-        except (KeyError, TypeError):
+        nat_allowed = self._metadata_nat_allowed(api_server)
+        if nat_allowed is None:
             nat_allowed = image.nat_allowed if image else True
         status = api_server.status
         fault = api_server.fault.get('message', None)
         task = api_server.task_state
+        power_state = api_server.power_state
+        if not 0 <= power_state < len(self._POWER_STATES):
+            power_state = 0
         # Find IP addresses specifically on the tenant network that is connected
         # to the router
-        network = self._tenant_network()
-        # Function to get the first IP of a particular type on the tenant network
-        def ip_of_type(ip_type):
-            return next(
-                (
-                    a['addr']
-                    for a in api_server.addresses.get(network.name, [])
-                    if a['version'] == 4 and a['OS-EXT-IPS:type'] == ip_type
-                ),
-                None
-            )
+        network = tenant_network or self._tenant_network()
+        # Find the first IPv4 fixed and floating IPs on the tenant network in one pass
+        fixed_ip = floating_ip = None
+        for address in api_server.addresses.get(network.name, ()):
+            if address['version'] != 4:
+                continue
+            ip_type = address['OS-EXT-IPS:type']
+            if ip_type == 'fixed' and fixed_ip is None:
+                fixed_ip = address['addr']
+            elif ip_type == 'floating' and floating_ip is None:
+                floating_ip = address['addr']
+            if fixed_ip and floating_ip:
+                break
         return dto.Machine(
             api_server.id,
             api_server.name,
@@ -513,14 +774,14 @@ class ScopedSession(base.ScopedSession):
                 status,
                 _replace_resource_names(fault) if fault else None
             ),
-            self._POWER_STATES[api_server.power_state],
+            self._POWER_STATES[power_state],
             task.capitalize() if task else None,
-            ip_of_type('fixed'),
-            ip_of_type('floating'),
+            fixed_ip,
+            floating_ip,
             nat_allowed,
             tuple(v['id'] for v in api_server.attached_volumes),
             api_server.user_id,
-            dateutil.parser.parse(api_server.created)
+            parse_datetime(api_server.created)
         )
 
     @convert_exceptions
@@ -529,10 +790,15 @@ class ScopedSession(base.ScopedSession):
         See :py:meth:`.base.ScopedSession.machines`.
         """
         self._log('Fetching available servers')
+        # The tenant network is the same for every server, so only fetch it once
+        # It doesn't depend on the servers, so fetch it while they are listed
+        tenant_network = _executor.submit(self._tenant_network)
         # In order to get fault info, we need to use a custom resource definition
+        api_servers = tuple(self._connection.compute.servers.all())
+        tenant_network = tenant_network.result()
         servers = tuple(
-            self._from_api_server(s)
-            for s in self._connection.compute.servers.all()
+            self._from_api_server(api_server, tenant_network)
+            for api_server in api_servers
         )
         self._log('Found %s servers', len(servers))
         return servers
@@ -542,10 +808,53 @@ class ScopedSession(base.ScopedSession):
         """
         See :py:meth:`.base.ScopedSession.find_machine`.
         """
+        return self._cached(
+            ('machine', id),
+            lambda: self._fetch_machine(id),
+            _FIND_CACHE_TTL
+        )
+
+    def _fetch_machine(self, id):
         # In order to get fault info, we need to use a custom resource definition
         self._log("Fetching server with id '%s'", id)
         return self._from_api_server(self._connection.compute.servers.get(id))
 
+    def _get_or_create_keypair(self, ssh_key):
+        """
+        Returns a Nova keypair for the given SSH public key, creating it if required.
+        """
+        # Keypairs are immutable, i.e. once created cannot be changed, so a keypair
+        # we have already resolved for this key is still valid
+        # This also avoids decoding and hashing the key again
+        if ssh_key in self._keypairs:
+            return self._keypairs[ssh_key]
+        # We create keys with names of the form "<username>-<fingerprint>", which
+        # allows for us to recognise when a user has changed their key and create
+        # a new one
+        # The MD5 fingerprint must be kept so that existing keypairs are still found
+        # Isolate the key data between the key type and the comment
+        # The fields can be separated by any run of whitespace, including tabs
+        key_data = base64.b64decode(ssh_key.split(None, 2)[1])
+        fingerprint = hashlib.md5(key_data).hexdigest()
+        key_name = '{}-{}'.format(self._username, fingerprint)
+        try:
+            # We need to force a fetch so that the keypair is resolved
+            keypair = self._connection.compute.keypairs.get(key_name, force = True)
+        except rackit.NotFound:
+            keypair = self._connection.compute.keypairs.create(
+                name = key_name,
+                public_key = ssh_key
+            )
+        else:
+            # Make sure the keypair we found by name really holds the requested key
+            # Only the key type and data are compared, as the comment may differ
+            if keypair.public_key.split(None, 2)[:2] != ssh_key.split(None, 2)[:2]:
+                raise errors.InvalidOperationError(
+                    "Keypair '{}' exists with a different public key.".format(key_name)
+                )
+        self._keypairs[ssh_key] = keypair
+        return keypair
+
     @convert_exceptions
     def create_machine(self, name, image, size, ssh_key = None):
         """
@@ -571,14 +880,12 @@ class ScopedSession(base.ScopedSession):
         params.update(networks = [{ 'uuid': self._tenant_network().id }])
         # If the image asks for the backdoor network, attach it
         if getattr(api_image, 'jasmin_private_if', None):
-            if not self._az_backdoor_net_map:
+            if not self._az_backdoor_choices:
                 raise errors.ImproperlyConfiguredError(
                     'Backdoor network required by image but not configured.'
                 )
             # Pick an availability zone at random
-            #   random.choice needs something that supports indexing
-            choices = list(self._az_backdoor_net_map.items())
-            availability_zone, backdoor_net = random.choice(choices)
+            availability_zone, backdoor_net = random.choice(self._az_backdoor_choices)
             # If the availability zone is "nova" don't specify it, as per the advice
             # in the OpenStack API documentation
             if availability_zone != "nova":
@@ -591,38 +898,22 @@ class ScopedSession(base.ScopedSession):
             port = self._connection.network.ports.create(port_params)
             params['networks'].append({ 'port': port.id })
         # Get the keypair to inject
+        # This is only created once the checks above have passed
         if ssh_key:
-            # Keypairs are immutable, i.e. once created cannot be changed
-            # We create keys with names of the form "<username>-<fingerprint>", which
-            # allows for us to recognise when a user has changed their key and create
-            # a new one
-            fingerprint = hashlib.md5(base64.b64decode(ssh_key.split()[1])).hexdigest()
-            key_name = '{}-{}'.format(self._username, fingerprint)
-            try:
-                # We need to force a fetch so that the keypair is resolved
-                keypair = self._connection.compute.keypairs.get(key_name, force = True)
-            except rackit.NotFound:
-                keypair = self._connection.compute.keypairs.create(
-                    name = key_name,
-                    public_key = ssh_key
-                )
-            params.update(key_name = keypair.name)
+            params.update(key_name = self._get_or_create_keypair(ssh_key).name)
         # Pass metadata onto the machine from the image if present
         metadata = dict(jasmin_organisation = self._tenancy.name)
-        metadata.update({
-            item : getattr(api_image, item)
-            for item in {
-                'jasmin_nat_allowed',
-                'jasmin_type',
-                'jasmin_private_if',
-                'jasmin_activ_ver'
-            }
-            if getattr(api_image, item, None) is not None
-        })
+        for item in _IMAGE_METADATA_KEYS:
+            value = getattr(api_image, item, None)
+            if value is not None:
+                metadata[item] = value
         params.update(metadata = metadata)
         server = self._connection.compute.servers.create(params)
         return self.find_machine(server.id)
 
+    # For the power actions below, the server is fetched lazily, so it is only loaded
+    # once the action has been accepted and reflects the new task state
+
     @convert_exceptions
     def start_machine(self, machine):
         """
@@ -630,8 +921,10 @@ class ScopedSession(base.ScopedSession):
         """
         machine = machine.id if isinstance(machine, dto.Machine) else machine
         self._log("Starting machine '%s'", machine)
-        self._connection.compute.servers.get(machine).start()
-        return self.find_machine(machine)
+        server = self._connection.compute.servers.get(machine)
+        server.start()
+        self._evict(('machine', machine))
+        return self._from_api_server(server)
 
     @convert_exceptions
     def stop_machine(self, machine):
@@ -640,8 +933,10 @@ class ScopedSession(base.ScopedSession):
         """
         machine = machine.id if isinstance(machine, dto.Machine) else machine
         self._log("Stopping machine '%s'", machine)
-        self._connection.compute.servers.get(machine).stop()
-        return self.find_machine(machine)
+        server = self._connection.compute.servers.get(machine)
+        server.stop()
+        self._evict(('machine', machine))
+        return self._from_api_server(server)
 
     @convert_exceptions
     def restart_machine(self, machine):
@@ -650,8 +945,10 @@ class ScopedSession(base.ScopedSession):
         """
         machine = machine.id if isinstance(machine, dto.Machine) else machine
         self._log("Restarting machine '%s'", machine)
-        self._connection.compute.servers.get(machine).reboot('SOFT')
-        return self.find_machine(machine)
+        server = self._connection.compute.servers.get(machine)
+        server.reboot('SOFT')
+        self._evict(('machine', machine))
+        return self._from_api_server(server)
 
     @convert_exceptions
     def delete_machine(self, machine):
@@ -661,35 +958,64 @@ class ScopedSession(base.ScopedSession):
         machine = machine.id if isinstance(machine, dto.Machine) else machine
         self._log("Deleting machine '%s'", machine)
         # First, delete any associated ports
-        for port in self._connection.network.ports.all(device_id = machine):
-            port._delete()
+        # The deletes are independent, so issue them concurrently
+        ports = tuple(self._connection.network.ports.all(device_id = machine))
+        deletes = [_executor.submit(port._delete) for port in ports]
+        # Wait for every delete to finish before reporting any failure, so that
+        # one failure does not leave other ports half-deleted
+        failures = [exc for exc in (f.exception() for f in deletes) if exc]
+        for exc in failures[1:]:
+            self._log('Failed to delete port: %s', exc, level = logging.WARNING)
+        if failures:
+            raise failures[0]
         self._connection.compute.servers.delete(machine)
+        # Deleting the ports also detaches any external IPs
+        self._evict(('machine', machine))
+        self._evict_kind('external_ip')
         try:
             return self.find_machine(machine)
         except errors.ObjectNotFoundError:
             return None
 
-    def _from_api_floatingip(self, api_floatingip):
+    def _from_api_floatingip(self, api_floatingip, port_devices = None):
         """
         Converts an OpenStack API floatingip object into a :py:class:`.dto.ExternalIp`.
+
+        If given, ``port_devices`` maps port ids to device ids and is consulted
+        before fetching the port.
         """
-        if api_floatingip.port_id:
-            port = self._connection.network.ports.get(api_floatingip.port_id)
-            machine_id = port.device_id
-        else:
+        port_id = api_floatingip.port_id
+        if not port_id:
             machine_id = None
+        elif port_devices and port_id in port_devices:
+            machine_id = port_devices[port_id]
+        else:
+            machine_id = self._connection.network.ports.get(port_id).device_id
         return dto.ExternalIp(api_floatingip.floating_ip_address, machine_id)
 
+    def _port_devices(self, port_ids):
+        """
+        Returns a dictionary mapping the given port ids to device ids, fetching
+        the ports in batches rather than one at a time.
+        """
+        port_ids = list(port_ids)
+        port_devices = {}
+        # Keep the query string to a reasonable length
+        for i in range(0, len(port_ids), _PORT_BATCH_SIZE):
+            ports = self._connection.network.ports.all(id = port_ids[i:i + _PORT_BATCH_SIZE])
+            port_devices.update((port.id, port.device_id) for port in ports)
+        return port_devices
+
     @convert_exceptions
     def external_ips(self):
         """
         See :py:meth:`.base.ScopedSession.external_ips`.
         """
         self._log("Fetching floating ips")
-        fips = tuple(
-            self._from_api_floatingip(fip)
-            for fip in self._connection.network.floatingips.all()
-        )
+        api_fips = tuple(self._connection.network.floatingips.all())
+        # Fetch the ports for all the attached IPs in as few requests as possible
+        port_devices = self._port_devices(fip.port_id for fip in api_fips if fip.port_id)
+        fips = tuple(self._from_api_floatingip(fip, port_devices) for fip in api_fips)
         self._log("Found %s floating ips", len(fips))
         return fips
 
@@ -711,6 +1037,13 @@ class ScopedSession(base.ScopedSession):
         """
         See :py:meth:`.base.ScopedSession.find_external_ip`.
         """
+        return self._cached(
+            ('external_ip', ip),
+            lambda: self._fetch_external_ip(ip),
+            _FIND_CACHE_TTL
+        )
+
+    def _fetch_external_ip(self, ip):
         self._log("Fetching floating IP details for '%s'", ip)
         fip = self._connection.network.floatingips.find_by_floating_ip_address(ip)
         if not fip:
@@ -722,20 +1055,26 @@ class ScopedSession(base.ScopedSession):
         """
         See :py:meth:`.base.ScopedSession.attach_external_ip`.
         """
-        machine = machine if isinstance(machine, dto.Machine) else self.find_machine(machine)
+        # Only fetch what is needed for the NAT check rather than a full machine
+        if isinstance(machine, dto.Machine):
+            nat_allowed = machine.nat_allowed
+            machine = machine.id
+        else:
+            nat_allowed = self._machine_nat_allowed(machine)
         ip = ip.external_ip if isinstance(ip, dto.ExternalIp) else ip
         # If NATing is not allowed for the machine, bail
-        if not machine.nat_allowed:
+        if not nat_allowed:
             raise errors.InvalidOperationError(
                 'Machine is not allowed to have an external IP address.'
             )
-        self._log("Attaching floating ip '%s' to server '%s'", ip, machine.id)
+        self._log("Attaching floating ip '%s' to server '%s'", ip, machine)
         # Get the port that attaches the machine to the tenant network
         tenant_net = self._tenant_network()
         port = next(
             self._connection.network.ports.all(
-                device_id = machine.id,
-                network_id = tenant_net.id
+                device_id = machine,
+                network_id = tenant_net.id,
+                limit = 1
             ),
             None
         )
@@ -743,14 +1082,20 @@ class ScopedSession(base.ScopedSession):
             raise errors.ImproperlyConfiguredError(
                 'Machine is not connected to tenancy network.'
             )
-        # If there is already a floating IP associated with the port, detach it
-        current = self._connection.network.floatingips.find_by_port_id(port.id)
-        if current:
-            current._update(port_id = None)
         # Find the floating IP instance for the given address
+        # Use filtered queries so the cost does not grow with the number of IPs
         fip = self._connection.network.floatingips.find_by_floating_ip_address(ip)
         if not fip:
             raise errors.ObjectNotFoundError("Could not find external IP '{}'".format(ip))
+        # If the floating IP is already attached to the machine, there is nothing to do
+        if fip.port_id == port.id:
+            return self._from_api_floatingip(fip, { port.id: machine })
+        current = self._connection.network.floatingips.find_by_port_id(port.id)
+        # If there is already a floating IP associated with the port, detach it
+        if current:
+            current._update(port_id = None)
+            self._evict(('external_ip', current.floating_ip_address))
+        self._evict(('external_ip', ip), ('machine', machine))
         # Associate the floating IP with the port
         return self._from_api_floatingip(fip._update(port_id = port.id))
 
@@ -766,7 +1111,11 @@ class ScopedSession(base.ScopedSession):
         if not fip:
             raise errors.ObjectNotFoundError("Could not find external IP '{}'".format(ip))
         # Remove any association for the floating IP
-        return self._from_api_floatingip(fip._update(port_id = None))
+        fip = fip._update(port_id = None)
+        # Only the machine that had the IP needs to be refreshed
+        self._evict(('external_ip', ip))
+        self._evict_kind('machine', lambda machine: machine.external_ip == ip)
+        return self._from_api_floatingip(fip)
 
     _VOLUME_STATUSES = {
         'creating': dto.Volume.Status.CREATING,
@@ -788,10 +1137,11 @@ class ScopedSession(base.ScopedSession):
         Converts an OpenStack SDK volume object into a :py:class:`.dto.Volume`.
         """
         # Work out the volume status
-        status = self._VOLUME_STATUSES.get(
-            api_volume.status.lower(),
-            dto.Volume.Status.OTHER
-        )
+        # Cinder reports statuses in lower case, so only normalise on a miss
+        statuses = self._VOLUME_STATUSES
+        status = statuses.get(api_volume.status)
+        if status is None:
+            status = statuses.get(api_volume.status.lower(), dto.Volume.Status.OTHER)
         try:
             attachment = api_volume.attachments[0]
         except IndexError:
@@ -824,6 +1174,13 @@ class ScopedSession(base.ScopedSession):
         """
         See :py:meth:`.base.ScopedSession.find_volume`.
         """
+        return self._cached(
+            ('volume', id),
+            lambda: self._fetch_volume(id),
+            _FIND_CACHE_TTL
+        )
+
+    def _fetch_volume(self, id):
         self._log("Fetching volume with id '%s'", id)
         volume = self._connection.block_store.volumes.get(id)
         return self._from_api_volume(volume)
@@ -849,6 +1206,7 @@ class ScopedSession(base.ScopedSession):
             )
         self._log("Deleting volume '%s'", volume.id)
         self._connection.block_store.volumes.delete(volume.id)
+        self._evict(('volume', volume.id))
         try:
             return self.find_volume(volume.id)
         except errors.ObjectNotFoundError:
@@ -874,6 +1232,7 @@ class ScopedSession(base.ScopedSession):
         server.volume_attachments.create(volume_id = volume.id)
         # Refresh the volume in the cache
         self._connection.block_store.volumes.get(volume.id, force = True)
+        self._evict(('volume', volume.id), ('machine', machine))
         return self.find_volume(volume.id)
 
     @convert_exceptions
@@ -890,6 +1249,7 @@ class ScopedSession(base.ScopedSession):
         server.volume_attachments.find_by_volume_id(volume.id, as_params = False)._delete()
         # Refresh the volume in the cache
         self._connection.block_store.volumes.get(volume.id, force = True)
+        self._evict(('volume', volume.id), ('machine', volume.machine_id))
         return self.find_volume(volume.id)
 
     @property
@@ -925,48 +1285,80 @@ class ScopedSession(base.ScopedSession):
         """
         See :py:meth:`.base.ScopedSession.find_cluster_type`.
         """
-        return self.cluster_manager.find_cluster_type(name)
+        # Updating a cluster validates the parameters against its cluster type
+        # both in the view and in update_cluster, so cache the lookup
+        return self._cached(
+            ('cluster_type', name),
+            lambda: self.cluster_manager.find_cluster_type(name)
+        )
 
     def _fixup_cluster(self, cluster):
         """
         Fix up the cluster with any OpenStack-specific changes.
         """
-        # Remove injected parameters from the cluster params
-        params = {
-            k: v
-            for k, v in cluster.parameter_values.items()
-            if k != 'cluster_network'
-        }
-        # Add any tags attached to the stack
+        return self._apply_stack(cluster, self._fetch_stack(cluster.name))
+
+    def _fetch_stack(self, name):
+        """
+        Returns the Heat stack for the cluster with the given name, or ``None``.
+        """
+        # Stacks change rarely, so cache them briefly to absorb polling
+        return self._cached(
+            ('stack', name),
+            lambda: self._find_stack(name),
+            _STACKS_CACHE_TTL
+        )
+
+    def _find_stack(self, name):
         try:
-            stack = self._connection.orchestration.stacks.find_by_stack_name(cluster.name)
+            return self._connection.orchestration.stacks.find_by_stack_name(name)
         except rackit.NotFound:
-            stack = None
+            return None
+
+    def _stacks_by_name(self):
+        """
+        Returns a dictionary of the Heat stacks in the tenancy indexed by name.
+
+        Listing the stacks once is much cheaper than looking them up by name
+        for each cluster.
+        """
+        stacks = {}
+        for stack in self._connection.orchestration.stacks.all():
+            # Match find_by_stack_name, which returns the first stack with the name
+            stacks.setdefault(stack.stack_name, stack)
+        return stacks
+
+    def _apply_stack(self, cluster, stack):
+        """
+        Fix up the cluster with any OpenStack-specific changes using the given stack.
+        """
+        # Remove injected parameters from the cluster params, only copying them
+        # if there is something to remove
+        params = cluster.parameter_values
+        if 'cluster_network' in params:
+            params = dict(params)
+            del params['cluster_network']
+        # Add any tags attached to the stack
         # We use this format because tags might exist on the stack but be None
-        stack_tags = tuple(getattr(stack, 'tags', None) or [])
-        original_error = (cluster.error_message or '').lower()
-        # Convert quota-related error messages based on known OpenStack errors
-        if any(m in original_error for m in {'quota exceeded', 'exceedsavailablequota'}):
-            if 'floatingip' in original_error:
-                error_message = (
-                    'Could not find an external IP for deployment. '
-                    'Please ensure an external IP is available and try again.'
-                )
-            else:
-                error_message = (
-                    'Requested resources exceed at least one quota. '
-                    'Please check your tenancy quotas and try again.'
-                )
-        elif cluster.error_message:
-            error_message = (
-                'Error during cluster configuration. '
-                'Please contact support.'
-            )
-        else:
+        stack_tags = getattr(stack, 'tags', None)
+        tags = cluster.tags + tuple(stack_tags) if stack_tags else cluster.tags
+        # Most clusters have no error, in which case there is nothing to scan
+        if not cluster.error_message:
             error_message = None
+        else:
+            # Find all the known OpenStack error markers in a single pass over the message
+            markers = {
+                m.lower()
+                for m in _CLUSTER_ERROR_MARKERS_RE.findall(cluster.error_message)
+            }
+            # Convert quota-related error messages based on known OpenStack errors
+            quota_exceeded = bool(markers - {'floatingip'})
+            error_message = _CLUSTER_ERROR_MESSAGES[
+                (quota_exceeded, quota_exceeded and 'floatingip' in markers)
+            ]
         return cluster._replace(
             parameter_values = params,
-            tags = cluster.tags + stack_tags,
+            tags = tags,
             error_message = error_message
         )
 
@@ -975,39 +1367,81 @@ class ScopedSession(base.ScopedSession):
         """
         See :py:meth:`.base.ScopedSession.clusters`.
         """
-        return tuple(
-            self._fixup_cluster(c)
-            for c in self.cluster_manager.clusters()
+        # Cluster validation may ask for the clusters several times in one request,
+        # so remember the listing briefly
+        return self._cached('clusters', self._fetch_clusters, _FIND_CACHE_TTL)
+
+    def _fetch_clusters(self):
+        # The stacks are independent of the clusters, so if they are not cached
+        # list them at the same time
+        # Only the request runs in the background - the cache is only touched here
+        stacks = None
+        if not self._is_cached('stacks'):
+            stacks = _executor.submit(self._stacks_by_name)
+        clusters = self.cluster_manager.clusters()
+        stacks = self._cached(
+            'stacks',
+            stacks.result if stacks else self._stacks_by_name,
+            _STACKS_CACHE_TTL
         )
+        # The result is cached and shared between callers, so make it immutable
+        return tuple(self._apply_stack(c, stacks.get(c.name)) for c in clusters)
 
     @convert_exceptions
     def find_cluster(self, id):
         """
         See :py:meth:`.base.ScopedSession.find_cluster`.
         """
-        return self._fixup_cluster(
-            self.cluster_manager.find_cluster(id)
+        return self._cached(
+            ('cluster', id),
+            lambda: self._fixup_cluster(self.cluster_manager.find_cluster(id)),
+            _FIND_CACHE_TTL
         )
 
-    def _cluster_credential(self):
-        return dict(
-            auth_url = self._connection.auth_url,
-            project_id = self._connection.project_id,
-            token = self._connection.token
+    def _fixup_changed_cluster(self, cluster):
+        """
+        Fix up a cluster that has just been changed, making sure that neither the
+        cluster nor its stack are served from the cache.
+        """
+        self._evict(
+            'clusters',
+            'stacks',
+            ('cluster', cluster.id),
+            ('stack', cluster.name)
         )
+        return self._fixup_cluster(cluster)
+
+    def _cluster_credential(self):
+        # The credential only changes if the token does, so build it once per token
+        token = self._connection.token
+        cached = self._cluster_credential_cache
+        if not cached or cached[0] != token:
+            cached = self._cluster_credential_cache = (
+                token,
+                dict(
+                    auth_url = self._connection.auth_url,
+                    project_id = self._connection.project_id,
+                    token = token
+                )
+            )
+        return cached[1]
 
     @convert_exceptions
     def create_cluster(self, name, cluster_type, params, ssh_key):
         """
         See :py:meth:`.base.ScopedSession.create_cluster`.
         """
+        # The networks are cached by the session, but on a cold cache they are
+        # independent lookups, so fetch them while the params are validated
+        external_network = _executor.submit(self._external_network)
+        tenant_network = _executor.submit(self._tenant_network)
         params = self.validate_cluster_params(cluster_type, params)
         # Inject information about the networks to use
         params.update(
-            cluster_floating_network = self._external_network().name,
-            cluster_network = self._tenant_network().name
+            cluster_floating_network = external_network.result().name,
+            cluster_network = tenant_network.result().name
         )
-        return self._fixup_cluster(
+        return self._fixup_changed_cluster(
             self.cluster_manager.create_cluster(
                 name,
                 cluster_type,
@@ -1024,7 +1458,7 @@ class ScopedSession(base.ScopedSession):
         """
         if not isinstance(cluster, dto.Cluster):
             cluster = self.find_cluster(cluster)
-        return self._fixup_cluster(
+        return self._fixup_changed_cluster(
             self.cluster_manager.update_cluster(
                 cluster,
                 self.validate_cluster_params(
@@ -1041,7 +1475,7 @@ class ScopedSession(base.ScopedSession):
         """
         See :py:meth:`.base.ScopedSession.patch_cluster`.
         """
-        return self._fixup_cluster(
+        return self._fixup_changed_cluster(
             self.cluster_manager.patch_cluster(
                 cluster,
                 self._cluster_credential()
@@ -1053,7 +1487,7 @@ class ScopedSession(base.ScopedSession):
         """
         See :py:meth:`.base.ScopedSession.delete_cluster`.
         """
-        return self._fixup_cluster(
+        return self._fixup_changed_cluster(
             self.cluster_manager.delete_cluster(
                 cluster,
                 self._cluster_credential()
@@ -1065,8 +1499,11 @@ class ScopedSession(base.ScopedSession):
         """
         See :py:meth:`.base.ScopedSession.close`.
         """
-        # Make sure the underlying api connection is closed
-        self._connection.close()
-        # Also close the cluster manager if one has been created
+        # The api connection is owned by the unscoped session that created it,
+        # so it is closed with that session rather than here
+        # Drop any cached resources
+        self._cache = {}
+        self._cluster_credential_cache = None
+        # Close the cluster manager if one has been created
         if getattr(self, '_cluster_manager', None):
             self._cluster_manager.close()
@@ -0,0 +1,20 @@
+"""
+This module contains helpers that are shared between provider implementations.
+"""
+
+try:
+    from ciso8601 import parse_datetime as _parse_datetime
+except ImportError:
+    from dateutil.parser import isoparse as _parse_datetime
+
+
+def parse_datetime(value):
+    """
+    Parses an ISO 8601 timestamp, as returned by the OpenStack and AWX APIs,
+    into a :py:class:`datetime.datetime`.
+
+    Uses ``ciso8601`` if it is installed, otherwise ``dateutil``. Unlike
+    ``datetime.fromisoformat``, both accept every form the APIs return, e.g. a
+    ``Z`` suffix, offsets without a colon and any number of fractional digits.
+    """
+    return _parse_datetime(value)
@@ -0,0 +1,39 @@
+"""
+Django REST Framework renderers for the jasmin_cloud app.
+"""
+
+import orjson
+
+from rest_framework import renderers
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """
+    JSON renderer that uses `orjson <https://github.com/ijl/orjson>`_ to encode
+    responses.
+
+    The output matches the standard DRF renderer. If the client asked for indented
+    output or the ``UNICODE_JSON``/``COMPACT_JSON`` settings have been changed
+    from their defaults, this falls back to the standard DRF renderer.
+    """
+    #: Options for orjson - datetimes are passed to the DRF encoder so that they
+    #: are formatted in exactly the same way as the standard renderer
+    orjson_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type = None, renderer_context = None):
+        # orjson always produces compact, non-ASCII-escaped output
+        if data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        # orjson only supports a fixed indent, so leave indented output to DRF
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Use the DRF encoder for any types that orjson doesn't handle natively
+        ret = orjson.dumps(
+            data,
+            default = self.encoder_class().default,
+            option = self.orjson_options
+        )
+        # Like DRF, escape the line and paragraph separators, which are valid in
+        # JSON but not in JavaScript, so the output is safe to embed in <script>
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
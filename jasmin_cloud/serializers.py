@@ -11,6 +11,67 @@ from rest_framework import serializers
 from .provider import dto, errors
 
 
+def _absolute_uri(context, path):
+    """
+    Returns the absolute URI for the given path using the request in the
+    serializer context.
+
+    The scheme and host are only worked out once per context, which is shared
+    by every item of a ``many = True`` serializer and by nested serializers.
+    """
+    try:
+        prefix = context['uri_prefix']
+    except KeyError:
+        # For the root path, this is just the scheme and host plus a slash
+        prefix = context['uri_prefix'] = context['request'].build_absolute_uri('/')[:-1]
+    return prefix + path
+
+
+class DtoSerializer(serializers.Serializer):
+    """
+    Base class for serializers produced by :py:func:`make_dto_serializer`.
+
+    Plain ``ReadOnlyField``s that read the attribute of the same name are
+    serialized using a direct attribute lookup, skipping the per-field
+    ``get_attribute``/``to_representation`` calls made by DRF. Which fields
+    can take this path is worked out once per serializer class.
+    """
+    def _fast_field_names(self):
+        cls = type(self)
+        # Look in the class dict so that subclasses don't inherit their parent's names
+        names = cls.__dict__.get('_fast_field_names_cache')
+        if names is None:
+            names = frozenset(
+                field.field_name
+                for field in self._readable_fields
+                if type(field) is serializers.ReadOnlyField and
+                   field.source_attrs == [field.field_name]
+            )
+            cls._fast_field_names_cache = names
+        return names
+
+    def to_representation(self, instance):
+        fast_field_names = self._fast_field_names()
+        result = collections.OrderedDict()
+        for field in self._readable_fields:
+            if field.field_name in fast_field_names:
+                # Match ReadOnlyField, which skips missing attributes
+                try:
+                    result[field.field_name] = getattr(instance, field.field_name)
+                except AttributeError:
+                    pass
+                continue
+            try:
+                attribute = field.get_attribute(instance)
+            except serializers.SkipField:
+                continue
+            if attribute is None:
+                result[field.field_name] = None
+            else:
+                result[field.field_name] = field.to_representation(attribute)
+        return result
+
+
 def make_dto_serializer(dto_class, exclude = []):
     """
     Returns a new serializer class for the given DTO class, which should be
@@ -24,11 +85,11 @@ def make_dto_serializer(dto_class, exclude = []):
         exclude: A list of field names to exclude.
 
     Returns:
-        A subclass of ``rest_framework.serializers.Serializer``.
+        A subclass of :py:class:`DtoSerializer`.
     """
     return type(
         dto_class.__name__ + 'Serializer',
-        (serializers.Serializer, ),
+        (DtoSerializer, ),
         {
             name: serializers.ReadOnlyField()
             for name in dto_class._fields
@@ -52,42 +113,50 @@ class TenancySerializer(make_dto_serializer(dto.Tenancy)):
         request = self.context.get('request')
         if request:
             result.setdefault('links', {}).update({
-                'quotas': request.build_absolute_uri(
+                'quotas': _absolute_uri(
+                    self.context,
                     reverse('jasmin_cloud:quotas', kwargs = {
                         'tenant': obj.id,
                     })
                 ),
-                'images': request.build_absolute_uri(
+                'images': _absolute_uri(
+                    self.context,
                     reverse('jasmin_cloud:images', kwargs = {
                         'tenant': obj.id,
                     })
                 ),
-                'sizes': request.build_absolute_uri(
+                'sizes': _absolute_uri(
+                    self.context,
                     reverse('jasmin_cloud:sizes', kwargs = {
                         'tenant': obj.id,
                     })
                 ),
-                'volumes': request.build_absolute_uri(
+                'volumes': _absolute_uri(
+                    self.context,
                     reverse('jasmin_cloud:volumes', kwargs = {
                         'tenant': obj.id,
                     })
                 ),
-                'external_ips': request.build_absolute_uri(
+                'external_ips': _absolute_uri(
+                    self.context,
                     reverse('jasmin_cloud:external_ips', kwargs = {
                         'tenant': obj.id,
                     })
                 ),
-                'machines': request.build_absolute_uri(
+                'machines': _absolute_uri(
+                    self.context,
                     reverse('jasmin_cloud:machines', kwargs = {
                         'tenant': obj.id,
                     })
                 ),
-                'cluster_types': request.build_absolute_uri(
+                'cluster_types': _absolute_uri(
+                    self.context,
                     reverse('jasmin_cloud:cluster_types', kwargs = {
                         'tenant': obj.id,
                     })
                 ),
-                'clusters': request.build_absolute_uri(
+                'clusters': _absolute_uri(
+                    self.context,
                     reverse('jasmin_cloud:clusters', kwargs = {
                         'tenant': obj.id,
                     })
@@ -106,7 +175,8 @@ class ImageSerializer(make_dto_serializer(dto.Image, exclude = ['vm_type'])):
         request = self.context.get('request')
         tenant = self.context.get('tenant')
         if request and tenant:
-            result.setdefault('links', {})['self'] = request.build_absolute_uri(
+            result.setdefault('links', {})['self'] = _absolute_uri(
+                self.context,
                 reverse('jasmin_cloud:image_details', kwargs = {
                     'tenant': tenant,
                     'image': obj.id,
@@ -122,7 +192,8 @@ class SizeSerializer(make_dto_serializer(dto.Size)):
         request = self.context.get('request')
         tenant = self.context.get('tenant')
         if request and tenant:
-            result.setdefault('links', {})['self'] = request.build_absolute_uri(
+            result.setdefault('links', {})['self'] = _absolute_uri(
+                self.context,
                 reverse('jasmin_cloud:size_details', kwargs = {
                     'tenant': tenant,
                     'size': obj.id,
@@ -143,7 +214,8 @@ class VolumeRefSerializer(serializers.Serializer):
         request = self.context.get('request')
         tenant = self.context.get('tenant')
         if request and tenant:
-            result.setdefault('links', {})['self'] = request.build_absolute_uri(
+            result.setdefault('links', {})['self'] = _absolute_uri(
+                self.context,
                 reverse('jasmin_cloud:volume_details', kwargs = {
                     'tenant': tenant,
                     'volume': obj.id,
@@ -162,7 +234,8 @@ class MachineRefSerializer(serializers.Serializer):
         tenant = self.context.get('tenant')
         if request and tenant:
             result.setdefault('links', {}).update({
-                'self': request.build_absolute_uri(
+                'self': _absolute_uri(
+                    self.context,
                     reverse('jasmin_cloud:machine_details', kwargs = {
                         'tenant': tenant,
                         'machine': obj.id,
@@ -222,19 +295,22 @@ class MachineSerializer(
         tenant = self.context.get('tenant')
         if request and tenant:
             result.setdefault('links', {}).update({
-                'start': request.build_absolute_uri(
+                'start': _absolute_uri(
+                    self.context,
                     reverse('jasmin_cloud:machine_start', kwargs = {
                         'tenant': tenant,
                         'machine': obj.id,
                     })
                 ),
-                'stop': request.build_absolute_uri(
+                'stop': _absolute_uri(
+                    self.context,
                     reverse('jasmin_cloud:machine_stop', kwargs = {
                         'tenant': tenant,
                         'machine': obj.id,
                     })
                 ),
-                'restart': request.build_absolute_uri(
+                'restart': _absolute_uri(
+                    self.context,
                     reverse('jasmin_cloud:machine_restart', kwargs = {
                         'tenant': tenant,
                         'machine': obj.id,
@@ -256,7 +332,8 @@ class ExternalIPSerializer(make_dto_serializer(dto.ExternalIp)):
         request = self.context.get('request')
         tenant = self.context.get('tenant')
         if request and tenant:
-            result.setdefault('links', {})['self'] = request.build_absolute_uri(
+            result.setdefault('links', {})['self'] = _absolute_uri(
+                self.context,
                 reverse('jasmin_cloud:external_ip_details', kwargs = {
                     'tenant': tenant,
                     'ip': obj.external_ip,
@@ -274,7 +351,8 @@ class ClusterTypeRefSerializer(serializers.Serializer):
         request = self.context.get('request')
         tenant = self.context.get('tenant')
         if request and tenant:
-            result.setdefault('links', {})['self'] = request.build_absolute_uri(
+            result.setdefault('links', {})['self'] = _absolute_uri(
+                self.context,
                 reverse('jasmin_cloud:cluster_type_details', kwargs = {
                     'tenant': tenant,
                     'cluster_type': obj.name,
@@ -303,13 +381,15 @@ class ClusterSerializer(make_dto_serializer(dto.Cluster)):
         tenant = self.context.get('tenant')
         if request and tenant:
             result.setdefault('links', {}).update({
-                'self': request.build_absolute_uri(
+                'self': _absolute_uri(
+                    self.context,
                     reverse('jasmin_cloud:cluster_details', kwargs = {
                         'tenant': tenant,
                         'cluster': obj.id,
                     })
                 ),
-                'patch': request.build_absolute_uri(
+                'patch': _absolute_uri(
+                    self.context,
                     reverse('jasmin_cloud:cluster_patch', kwargs = {
                         'tenant': tenant,
                         'cluster': obj.id,
@@ -319,6 +399,30 @@ class ClusterSerializer(make_dto_serializer(dto.Cluster)):
         return result
 
 
+class ClusterSummarySerializer(
+    make_dto_serializer(
+        dto.Cluster,
+        exclude = ['task', 'error_message', 'parameter_values', 'tags', 'updated', 'patched']
+    )
+):
+    status = serializers.ReadOnlyField(source = 'status.name')
+
+    def to_representation(self, obj):
+        result = super().to_representation(obj)
+        # If the info to build a link is in the context, add it
+        request = self.context.get('request')
+        tenant = self.context.get('tenant')
+        if request and tenant:
+            result.setdefault('links', {})['self'] = _absolute_uri(
+                self.context,
+                reverse('jasmin_cloud:cluster_details', kwargs = {
+                    'tenant': tenant,
+                    'cluster': obj.id,
+                })
+            )
+        return result
+
+
 class CreateClusterSerializer(serializers.Serializer):
     name = serializers.CharField(write_only = True)
     cluster_type = serializers.CharField(write_only = True)
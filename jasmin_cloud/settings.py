@@ -25,6 +25,9 @@ class JasminCloudSettings(SettingsObject):
     AVAILABLE_CLOUDS = Setting()
     #: The name of the current cloud
     CURRENT_CLOUD = Setting()
+    #: The number of seconds for which cluster GET responses are cached, or 0 to disable
+    #: Requires a cache backend that is shared between processes, e.g. memcached
+    CLUSTER_CACHE_TTL = Setting(default = 0)
 
 
 cloud_settings = JasminCloudSettings('JASMIN_CLOUD')
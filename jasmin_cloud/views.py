@@ -2,13 +2,14 @@
 Django views for interacting with the configured cloud provider.
 """
 
-import logging, functools
+import logging, functools, uuid
 
-from django.urls import reverse
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.urls import reverse, get_script_prefix
+from django.utils.cache import patch_vary_headers
 from django.utils.safestring import mark_safe
-from django.utils.encoding import smart_text
-
-from docutils import core
 
 from rest_framework import decorators, permissions, response, status, exceptions as drf_exceptions
 from rest_framework.utils import formatting
@@ -21,6 +22,123 @@ from .settings import cloud_settings
 log = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize = None)
+def _reverse(viewname, script_prefix):
+    # The script prefix is part of the key because reverse includes it in the path
+    return reverse(viewname)
+
+
+def _absolute_url(request, viewname):
+    """
+    Returns the absolute URL for the named view, which must take no arguments.
+
+    The path is only resolved once per view name, so each request only pays
+    for joining it onto the request's host.
+    """
+    return request.build_absolute_uri(_reverse(viewname, get_script_prefix()))
+
+
+@functools.lru_cache(maxsize = None)
+def _cluster_cache_enabled():
+    """
+    Returns ``True`` if cluster GET responses should be cached.
+
+    Writes evict the cached clusters for every process only if the cache is
+    shared, so a per-process cache backend disables caching.
+    """
+    if not cloud_settings.CLUSTER_CACHE_TTL:
+        return False
+    if isinstance(caches['default'], (DummyCache, LocMemCache)):
+        log.warning(
+            'CLUSTER_CACHE_TTL is set but the default cache is not shared '
+            'between processes - cluster caching is disabled'
+        )
+        return False
+    return True
+
+
+def _cluster_cache_version_key(tenant):
+    return 'jasmin_cloud:clusters:{}:version'.format(tenant)
+
+
+def _cached_cluster_data(request, tenant, name, build):
+    """
+    Returns the serialized cluster data with the given name for the tenant,
+    calling ``build`` to produce and cache it on a miss.
+
+    The key includes a version for the tenant, which is changed by every cluster
+    write, so that a write invalidates the cached data for all users of the
+    tenant at once. The serialized data is cached rather than the response, so
+    that content negotiation still happens for each request.
+    """
+    if not _cluster_cache_enabled():
+        return build()
+    version_key = _cluster_cache_version_key(tenant)
+    version = cache.get(version_key)
+    if version is None:
+        # If another process got there first, use the version that it set
+        cache.add(version_key, uuid.uuid4().hex, None)
+        version = cache.get(version_key)
+    # The scheme and host are included because the data contains absolute links
+    key = 'jasmin_cloud:clusters:{}:{}:{}://{}:{}:{}'.format(
+        tenant,
+        version,
+        request.scheme,
+        request.get_host(),
+        request.user.username,
+        name
+    )
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, cloud_settings.CLUSTER_CACHE_TTL)
+    return data
+
+
+def _evict_cluster_data(tenant):
+    """
+    Invalidates the cached cluster data for all users of the given tenant.
+    """
+    if _cluster_cache_enabled():
+        cache.set(_cluster_cache_version_key(tenant), uuid.uuid4().hex, None)
+
+
+def _prefers_minimal(request):
+    """
+    Returns ``True`` if the client sent ``Prefer: return=minimal`` (RFC 7240),
+    i.e. it does not need a representation of the modified resource.
+    """
+    prefer = request.META.get('HTTP_PREFER', '')
+    return any(
+        pref.strip().lower() == 'return=minimal'
+        for pref in prefer.split(',')
+    )
+
+
+def _changed_cluster_response(request, tenant, cluster):
+    """
+    Returns the response for a cluster that has been changed, which is empty if
+    the client prefers a minimal response or there is no cluster to return.
+    """
+    if _prefers_minimal(request):
+        # Tell the client that the empty body is intended
+        resp = response.Response(
+            status = status.HTTP_204_NO_CONTENT,
+            headers = { 'Preference-Applied': 'return=minimal' }
+        )
+    elif cluster:
+        serializer = serializers.ClusterSerializer(
+            cluster,
+            context = { 'request': request, 'tenant': tenant }
+        )
+        resp = response.Response(serializer.data)
+    else:
+        resp = response.Response()
+    # The body depends on the Prefer header, so caches must take it into account
+    patch_vary_headers(resp, ['Prefer'])
+    return resp
+
+
 def get_view_description(view_cls, html = False):
     """
     Alternative django-rest-framework ``VIEW_DESCRIPTION_FUNCTION`` that allows
@@ -29,9 +147,22 @@ def get_view_description(view_cls, html = False):
     This allows docstrings to be used in the DRF-generated HTML views and in
     Sphinx-generated API views.
     """
-    description = view_cls.__doc__ or ''
-    description = formatting.dedent(smart_text(description))
+    return _render_description(view_cls.__doc__ or '', html)
+
+
+@functools.lru_cache(maxsize = None)
+def _render_description(docstring, html):
+    """
+    Renders the given docstring, caching the result since docstrings never change.
+
+    The cache is keyed on the docstring rather than the view, as DRF passes
+    view instances, which are different for every request.
+    """
+    # __doc__ is always a str, so there is no need to coerce it first
+    description = formatting.dedent(docstring)
     if html:
+        # docutils is only needed to render the browsable API, so import it on first use
+        from docutils import core
         # Get just the HTML parts corresponding to the docstring
         parts = core.publish_parts(source = description, writer_name = 'html')
         html = parts['body_pre_docinfo'] + parts['fragment']
@@ -40,6 +171,22 @@ def get_view_description(view_cls, html = False):
     return description
 
 
+#: Maps provider errors to the code and HTTP status of the response to return
+_PROVIDER_ERROR_RESPONSES = {
+    provider_errors.UnsupportedOperationError: ('unsupported_operation', status.HTTP_404_NOT_FOUND),
+    provider_errors.QuotaExceededError: ('quota_exceeded', status.HTTP_409_CONFLICT),
+    provider_errors.InvalidOperationError: ('invalid_operation', status.HTTP_409_CONFLICT),
+    provider_errors.BadInputError: ('bad_input', status.HTTP_400_BAD_REQUEST),
+    provider_errors.OperationTimedOutError: ('operation_timed_out', status.HTTP_504_GATEWAY_TIMEOUT),
+}
+#: Maps provider errors to the equivalent DRF exception
+_PROVIDER_ERROR_EXCEPTIONS = {
+    provider_errors.AuthenticationError: drf_exceptions.AuthenticationFailed,
+    provider_errors.PermissionDeniedError: drf_exceptions.PermissionDenied,
+    provider_errors.ObjectNotFoundError: drf_exceptions.NotFound,
+}
+
+
 def convert_provider_exceptions(view):
     """
     Decorator that converts errors from :py:mod:`.provider.errors` into appropriate
@@ -49,41 +196,21 @@ def convert_provider_exceptions(view):
     def wrapper(*args, **kwargs):
         try:
             return view(*args, **kwargs)
-        # For provider errors that don't map to authentication/not found errors,
-        # return suitable responses
-        except provider_errors.UnsupportedOperationError as exc:
-            return response.Response(
-                { 'detail': str(exc), 'code': 'unsupported_operation'},
-                status = status.HTTP_404_NOT_FOUND
-            )
-        except provider_errors.QuotaExceededError as exc:
-            return response.Response(
-                { 'detail': str(exc), 'code': 'quota_exceeded'},
-                status = status.HTTP_409_CONFLICT
-            )
-        except provider_errors.InvalidOperationError as exc:
-            return response.Response(
-                { 'detail': str(exc), 'code': 'invalid_operation'},
-                status = status.HTTP_409_CONFLICT
-            )
-        except provider_errors.BadInputError as exc:
-            return response.Response(
-                { 'detail': str(exc), 'code': 'bad_input'},
-                status = status.HTTP_400_BAD_REQUEST
-            )
-        except provider_errors.OperationTimedOutError as exc:
-            return response.Response(
-                { 'detail': str(exc), 'code': 'operation_timed_out'},
-                status = status.HTTP_504_GATEWAY_TIMEOUT
-            )
-        # For authentication/not found errors, raise the DRF equivalent
-        except provider_errors.AuthenticationError as exc:
-            raise drf_exceptions.AuthenticationFailed(str(exc))
-        except provider_errors.PermissionDeniedError as exc:
-            raise drf_exceptions.PermissionDenied(str(exc))
-        except provider_errors.ObjectNotFoundError as exc:
-            raise drf_exceptions.NotFound(str(exc))
         except provider_errors.Error as exc:
+            # Walk the MRO so that the most specific mapping wins, e.g. a
+            # QuotaExceededError is not reported as an InvalidOperationError
+            for error_cls in type(exc).__mro__:
+                # For provider errors that don't map to authentication/not found errors,
+                # return suitable responses
+                if error_cls in _PROVIDER_ERROR_RESPONSES:
+                    code, status_code = _PROVIDER_ERROR_RESPONSES[error_cls]
+                    return response.Response(
+                        { 'detail': str(exc), 'code': code },
+                        status = status_code
+                    )
+                # For authentication/not found errors, raise the DRF equivalent
+                if error_cls in _PROVIDER_ERROR_EXCEPTIONS:
+                    raise _PROVIDER_ERROR_EXCEPTIONS[error_cls](str(exc))
             log.exception('Unexpected provider error occurred')
             return response.Response(
                 { 'detail': str(exc) },
@@ -110,8 +237,8 @@ def cloud_info(request):
         'available_clouds': cloud_settings.AVAILABLE_CLOUDS,
         'current_cloud': cloud_settings.CURRENT_CLOUD,
         'links': {
-            'authenticate': request.build_absolute_uri(reverse('jasmin_cloud:authenticate')),
-            'session': request.build_absolute_uri(reverse('jasmin_cloud:session'))
+            'authenticate': _absolute_url(request, 'jasmin_cloud:authenticate'),
+            'session': _absolute_url(request, 'jasmin_cloud:session')
         }
     })
 
@@ -144,7 +271,7 @@ def authenticate(request):
         'username': request.auth.username(),
         'token': request.auth.token(),
         'links': {
-            'tenancies': request.build_absolute_uri(reverse('jasmin_cloud:tenancies'))
+            'tenancies': _absolute_url(request, 'jasmin_cloud:tenancies')
         }
     })
 
@@ -165,7 +292,7 @@ def session(request):
             'username': request.auth.username(),
             'token': request.auth.token(),
             'links': {
-                'tenancies': request.build_absolute_uri(reverse('jasmin_cloud:tenancies'))
+                'tenancies': _absolute_url(request, 'jasmin_cloud:tenancies')
             }
         })
 
@@ -564,7 +691,9 @@ def cluster_type_details(request, tenant, cluster_type):
 @provider_api_view(['GET', 'POST'])
 def clusters(request, tenant):
     """
-    On ``GET`` requests, return a list of the deployed clusters.
+    On ``GET`` requests, return a list of the deployed clusters. If the
+    ``view=summary`` query parameter is given, only the id, name, cluster type,
+    status and creation time of each cluster are returned.
 
     On ``POST`` requests, create a new cluster.
     """
@@ -581,19 +710,33 @@ def clusters(request, tenant):
                 input_serializer.validated_data['parameter_values'],
                 cloud_settings.SSH_KEY_STORE.get_key(request.user.username)
             )
+        _evict_cluster_data(tenant)
         output_serializer = serializers.ClusterSerializer(
             cluster,
             context = { 'request': request, 'tenant': tenant }
         )
         return response.Response(output_serializer.data)
     else:
-        with request.auth.scoped_session(tenant) as session:
-            serializer = serializers.ClusterSerializer(
-                session.clusters(),
-                many = True,
-                context = { 'request': request, 'tenant': tenant }
-            )
-        return response.Response(serializer.data)
+        summary = request.query_params.get('view') == 'summary'
+        serializer_class = (
+            serializers.ClusterSummarySerializer
+            if summary
+            else serializers.ClusterSerializer
+        )
+        def build():
+            with request.auth.scoped_session(tenant) as session:
+                serializer = serializer_class(
+                    session.clusters(),
+                    many = True,
+                    context = { 'request': request, 'tenant': tenant }
+                )
+            return serializer.data
+        return response.Response(_cached_cluster_data(
+            request,
+            tenant,
+            'summary' if summary else 'list',
+            build
+        ))
 
 
 @provider_api_view(['GET', 'PUT', 'DELETE'])
@@ -604,6 +747,9 @@ def cluster_details(request, tenant, cluster):
     On ``PUT`` requests, update the named cluster with the given paramters.
 
     On ``DELETE`` requests, delete the named cluster.
+
+    For ``PUT`` and ``DELETE`` requests, clients that send
+    ``Prefer: return=minimal`` receive an empty ``204`` response.
     """
     if request.method == 'PUT':
         with request.auth.scoped_session(tenant) as session:
@@ -617,39 +763,37 @@ def cluster_details(request, tenant, cluster):
                 cluster,
                 input_serializer.validated_data['parameter_values']
             )
-        output_serializer = serializers.ClusterSerializer(
-            updated,
-            context = { 'request': request, 'tenant': tenant }
-        )
-        return response.Response(output_serializer.data)
+        _evict_cluster_data(tenant)
+        return _changed_cluster_response(request, tenant, updated)
     elif request.method == 'DELETE':
         with request.auth.scoped_session(tenant) as session:
             deleted = session.delete_cluster(cluster)
-        if deleted:
-            serializer = serializers.ClusterSerializer(
-                deleted,
-                context = { 'request': request, 'tenant': tenant }
-            )
-            return response.Response(serializer.data)
-        else:
-            return response.Response()
+        _evict_cluster_data(tenant)
+        return _changed_cluster_response(request, tenant, deleted)
     else:
-        with request.auth.scoped_session(tenant) as session:
-            serializer = serializers.ClusterSerializer(
-                session.find_cluster(cluster),
-                context = { 'request': request, 'tenant': tenant }
-            )
-        return response.Response(serializer.data)
+        def build():
+            with request.auth.scoped_session(tenant) as session:
+                serializer = serializers.ClusterSerializer(
+                    session.find_cluster(cluster),
+                    context = { 'request': request, 'tenant': tenant }
+                )
+            return serializer.data
+        return response.Response(_cached_cluster_data(
+            request,
+            tenant,
+            'cluster:{}'.format(cluster),
+            build
+        ))
 
 
 @provider_api_view(['POST'])
 def cluster_patch(request, tenant, cluster):
     """
     Patch the given cluster.
+
+    Clients that send ``Prefer: return=minimal`` receive an empty ``204`` response.
     """
     with request.auth.scoped_session(tenant) as session:
-        serializer = serializers.ClusterSerializer(
-            session.patch_cluster(cluster),
-            context = { 'request': request, 'tenant': tenant }
-        )
-    return response.Response(serializer.data)
+        patched = session.patch_cluster(cluster)
+    _evict_cluster_data(tenant)
+    return _changed_cluster_response(request, tenant, patched)
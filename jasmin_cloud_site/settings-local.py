@@ -1,7 +1,7 @@
 import os
 from jasmin_cloud.provider import openstack
 from jasmin_cloud.provider.cluster_engine import awx, mock
-from jasmin_cloud.keystore import dummy
+from jasmin_cloud.keystore import dummy, ldap
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -29,6 +29,18 @@ else:
     ]
     cluster_engine = Engine(cluster_types, "clusters_file.json")
 
+if True:
+    ssh_key_store = dummy.KeyStore(
+        key="ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQDQ/+ArQL72tvCFucr0iMezZ2sXgsZ4FTRgx9xdbW4rkoglS7DIw80NfUIx9x9sxo09bMzKMGjwKXR9LmOAsa7jUOfn45ksrUdlAlnmrskCVcC32Gc35lvD11OMke1cvFIaUCkS0VGYWF9aCkmG2yj90xSUf7G4lMpfKn2pjncJ66I/+L50m+DXTim/Zfax4NMMtPRk3O8uXeEk00qISjZevPo0x5XQBRPbLgFBXnkYLrJwu2n00AD5kFUgMELyB8KKFYIUv9KqUAG8OVQKHwgs+M11gxhMy1wEFW5yxROv6tENFCQbFvKjEsd3H9tNH5YNr2nBQfTQaZZIXmp+P6rj brtknr@MacBook"
+    )
+else:
+    ssh_key_store = ldap.LdapKeyStore(
+        primary="ldap://ldap.example.org",
+        base_dn="ou=users,dc=example,dc=org",
+        # Cache keys for a short time to avoid an LDAP round trip per request
+        cache_ttl=30,
+    )
+
 JASMIN_CLOUD = {
     "AVAILABLE_CLOUDS": {
         "current": {
@@ -43,9 +55,7 @@ JASMIN_CLOUD = {
         cluster_engine=cluster_engine,
         net_device_owner="network:ha_router_replicated_interface",
     ),
-    "SSH_KEY_STORE": dummy.KeyStore(
-        key="ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQDQ/+ArQL72tvCFucr0iMezZ2sXgsZ4FTRgx9xdbW4rkoglS7DIw80NfUIx9x9sxo09bMzKMGjwKXR9LmOAsa7jUOfn45ksrUdlAlnmrskCVcC32Gc35lvD11OMke1cvFIaUCkS0VGYWF9aCkmG2yj90xSUf7G4lMpfKn2pjncJ66I/+L50m+DXTim/Zfax4NMMtPRk3O8uXeEk00qISjZevPo0x5XQBRPbLgFBXnkYLrJwu2n00AD5kFUgMELyB8KKFYIUv9KqUAG8OVQKHwgs+M11gxhMy1wEFW5yxROv6tENFCQbFvKjEsd3H9tNH5YNr2nBQfTQaZZIXmp+P6rj brtknr@MacBook"
-    ),
+    "SSH_KEY_STORE": ssh_key_store,
 }
 
 # SECURITY WARNING: DO NOT USE THIS IN PRODUCTION
@@ -73,6 +83,8 @@ SESSION_SAVE_EVERY_REQUEST = True
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Adds ETags to API responses and answers matching If-None-Match with a 304
+    "django.middleware.http.ConditionalGetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -148,7 +160,11 @@ REST_FRAMEWORK = {
     #'DEFAULT_PERMISSION_CLASSES': [],
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "jasmin_cloud.authentication.TokenCookieAuthentication",
-    ]
+    ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "jasmin_cloud.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
 SPECTACULAR_SETTINGS = {
@@ -33,6 +33,7 @@ if __name__ == "__main__":
             'python-dateutil',
             'django',
             'djangorestframework',
+            'orjson',
             'django-settings-object',
             'jasmin-ldap',
             'pyyaml',